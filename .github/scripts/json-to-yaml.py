@@ -11,16 +11,16 @@ def json_to_yaml(subdir, file):
         obj = json.load(f)
 
     yaml_file = os.path.join(subdir, "metadata.yaml")
-    with open(yaml_file, "w") as f:
+    with open(yaml_file + ".tmp", "w") as f:
         yaml.dump(obj, f)
+    os.replace(yaml_file + ".tmp", yaml_file)
 
     os.remove(json_file)
 
 
 if __name__ == "__main__":
 
-    for subdir, dirs, files in os.walk("./apps"):
-        for f in files:
-            if f != "metadata.json":
-                continue
-            json_to_yaml(subdir, f)
+    for app in os.listdir("./apps"):
+        subdir = os.path.join("./apps", app)
+        if os.path.isfile(os.path.join(subdir, "metadata.json")):
+            json_to_yaml(subdir, "metadata.json")
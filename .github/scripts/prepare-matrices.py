@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import functools
 import importlib.util
 import sys
 import os
@@ -7,28 +8,69 @@ import json
 import yaml
 import requests
 
+from concurrent.futures import ThreadPoolExecutor
 from subprocess import check_output
 
 from os.path import isfile
+from requests.adapters import HTTPAdapter
+from urllib3.util import Retry
+
+# Prefer the libyaml-backed parser when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 repo_owner = os.environ.get('REPO_OWNER', os.environ.get('GITHUB_REPOSITORY_OWNER'))
 
 TESTABLE_PLATFORMS = ["linux/amd64"]
 
+# Version lookups are dominated by subprocess and GitHub API latency, so
+# apps are resolved concurrently rather than one after another.
+MAX_WORKERS = 8
+
+# Shared across lookups so GitHub API requests reuse pooled connections.
+# Transient 5xx responses and connection errors are retried with exponential
+# backoff. If every attempt returns a 5xx, the last response is handed back
+# so the image is treated as unpublished instead of failing the whole run.
+session = requests.Session()
+session.headers.update({"Accept": "application/vnd.github.v3+json"})
+session.mount("https://", HTTPAdapter(
+    pool_maxsize=MAX_WORKERS,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=1,
+        status_forcelist=[500, 502, 503, 504],
+        raise_on_status=False,
+    ),
+))
+
 def load_metadata_file_yaml(file_path):
     with open(file_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 def load_metadata_file_json(file_path):
     with open(file_path, "r") as f:
         return json.load(f)
 
-def get_latest_version_py(latest_py_path, channel_name):
-    spec = importlib.util.spec_from_file_location("latest", latest_py_path)
+def load_app_metadata(app_dir):
+    if isfile(os.path.join(app_dir, "metadata.yaml")):
+        return load_metadata_file_yaml(os.path.join(app_dir, "metadata.yaml"))
+    elif isfile(os.path.join(app_dir, "metadata.json")):
+        return load_metadata_file_json(os.path.join(app_dir, "metadata.json"))
+    return None
+
+# A ci/latest.py is shared by every channel of an app, so only load it once.
+# Each path is registered under its own module name because apps resolve
+# concurrently, and a shared "latest" entry could be swapped out mid-import.
+@functools.lru_cache(maxsize=None)
+def load_latest_module(latest_py_path):
+    module_name = f"latest_{abs(hash(latest_py_path))}"
+    spec = importlib.util.spec_from_file_location(module_name, latest_py_path)
     latest = importlib.util.module_from_spec(spec)
-    sys.modules["latest"] = latest
+    sys.modules[module_name] = latest
     spec.loader.exec_module(latest)
-    return latest.get_latest(channel_name)
+    return latest
+
+def get_latest_version_py(latest_py_path, channel_name):
+    return load_latest_module(latest_py_path).get_latest(channel_name)
 
 def get_latest_version_sh(latest_sh_path, channel_name):
     out = check_output([latest_sh_path, channel_name])
@@ -47,10 +89,9 @@ def get_latest_version(subdir, channel_name):
     return None
 
 def get_published_version(image_name):
-    r = requests.get(
+    r = session.get(
         f"https://api.github.com/users/{repo_owner}/packages/container/{image_name}/versions",
         headers={
-            "Accept": "application/vnd.github.v3+json",
             "Authorization": "token " + os.environ["TOKEN"]
         },
     )
@@ -58,7 +99,7 @@ def get_published_version(image_name):
     if r.status_code != 200:
         return None
 
-    data = json.loads(r.text)
+    data = r.json()
     for image in data:
         tags = image["metadata"]["container"]["tags"]
         if "rolling" in tags:
@@ -115,8 +156,7 @@ def get_image_metadata(subdir, meta, forRelease=False, force=False, channels=Non
 
             toBuild.setdefault("platforms", []).append(platform)
 
-            target_os = platform.split("/")[0]
-            target_arch = platform.split("/")[1]
+            target_os, target_arch = platform.split("/")[:2]
 
             platformToBuild = {}
             platformToBuild["name"] = toBuild["name"]
@@ -157,6 +197,7 @@ if __name__ == "__main__":
         "imagePlatforms": []
     }
 
+    jobs = []
     if apps != "all":
         channels=None
         apps = apps.split(",")
@@ -168,29 +209,26 @@ if __name__ == "__main__":
                 print(f"App \"{app}\" not found")
                 exit(1)
 
-            meta = None
-            if os.path.isfile(os.path.join("./apps", app, "metadata.yaml")):
-                meta = load_metadata_file_yaml(os.path.join("./apps", app, "metadata.yaml"))
-            elif os.path.isfile(os.path.join("./apps", app, "metadata.json")):
-                meta = load_metadata_file_json(os.path.join("./apps", app, "metadata.json"))
-
-            imageToBuild = get_image_metadata(os.path.join("./apps", app), meta, forRelease, force=force, channels=channels)
+            meta = load_app_metadata(os.path.join("./apps", app))
+            jobs.append((os.path.join("./apps", app), meta, channels))
+    else:
+        # Metadata only lives at the top of each app directory, so there is
+        # no need to walk the s6-overlay trees underneath
+        for app in sorted(os.listdir("./apps")):
+            subdir = os.path.join("./apps", app)
+            meta = load_app_metadata(subdir)
+            if meta is not None:
+                jobs.append((subdir, meta, None))
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        futures = [
+            executor.submit(get_image_metadata, subdir, meta, forRelease, force=force, channels=channels)
+            for subdir, meta, channels in jobs
+        ]
+        # Collect in submission order so the matrix output stays deterministic
+        for future in futures:
+            imageToBuild = future.result()
             if imageToBuild is not None:
                 imagesToBuild["images"].extend(imageToBuild["images"])
                 imagesToBuild["imagePlatforms"].extend(imageToBuild["imagePlatforms"])
-    else:
-        for subdir, dirs, files in os.walk("./apps"):
-            for file in files:
-                meta = None
-                if file == "metadata.yaml":
-                    meta = load_metadata_file_yaml(os.path.join(subdir, file))
-                elif file == "metadata.json":
-                    meta = load_metadata_file_json(os.path.join(subdir, file))
-                else:
-                    continue
-                if meta is not None:
-                    imageToBuild = get_image_metadata(subdir, meta, forRelease, force=force)
-                    if imageToBuild is not None:
-                        imagesToBuild["images"].extend(imageToBuild["images"])
-                        imagesToBuild["imagePlatforms"].extend(imageToBuild["imagePlatforms"])
     print(json.dumps(imagesToBuild))
@@ -1,10 +1,12 @@
 import os
 import json
-import requests
 import yaml
 
 from jinja2 import Environment, PackageLoader, select_autoescape
 
+# Prefer the libyaml-backed parser when PyYAML was built with it
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
 repo_owner = os.environ.get('REPO_OWNER', os.environ.get('GITHUB_REPOSITORY_OWNER'))
 repo_name = os.environ.get('REPO_NAME', os.environ.get('GITHUB_REPOSITORY'))
 
@@ -15,7 +17,7 @@ env = Environment(
 
 def load_metadata_file_yaml(file_path):
     with open(file_path, "r") as f:
-        return yaml.safe_load(f)
+        return yaml.load(f, Loader=YamlLoader)
 
 def load_metadata_file_json(file_path):
     with open(file_path, "r") as f:
@@ -31,11 +33,13 @@ def load_metadata_file(file_path):
 if __name__ == "__main__":
     base_images = []
     app_images = []
-    for subdir, dirs, files in os.walk("./apps"):
-        for file in files:
-            if file != "metadata.yaml" and file != "metadata.json":
+    # Metadata only lives at the top of each app directory, so there is no
+    # need to walk the s6-overlay trees underneath
+    for app in sorted(os.listdir("./apps")):
+        for file in ["metadata.yaml", "metadata.json"]:
+            if not os.path.isfile(os.path.join("./apps", app, file)):
                 continue
-            meta = load_metadata_file(os.path.join(subdir, file))
+            meta = load_metadata_file(os.path.join("./apps", app, file))
             for channel in meta["channels"]:
                 name = ""
                 if channel.get("stable", False):
@@ -54,5 +58,15 @@ if __name__ == "__main__":
                     app_images.append(image)
 
     template = env.get_template("README.md.j2")
-    with open("./README.md", "w") as f:
-        f.write(template.render(base_images=base_images, app_images=app_images))
+    readme = template.render(base_images=base_images, app_images=app_images)
+
+    # Leave the README untouched when nothing changed
+    if os.path.isfile("./README.md"):
+        with open("./README.md", "r") as f:
+            if f.read() == readme:
+                exit(0)
+
+    # Write next to the target and rename so the README is never left half written
+    with open("./README.md.tmp", "w") as f:
+        f.write(readme)
+    os.replace("./README.md.tmp", "./README.md")